@@ -16,18 +16,20 @@ API endpoints:
 Environment variables:
   JWT_SECRET_KEY=change_me
   MONGODB_URI=mongodb://localhost:27017/travel_tracker (default)
-  UPLOAD_FOLDER=uploads (default)
+  UPLOAD_FOLDER=uploads (default, used by the local photo storage)
+  PHOTO_STORAGE=local|gridfs|s3 (default: local, see storage.py)
 """
 
 import os
 import base64
+import hashlib
 import mimetypes
 from datetime import datetime, date
 from typing import Optional, Dict, Any
 from bson import ObjectId
 from bson.errors import InvalidId
 
-from flask import Flask, request, jsonify, abort, send_file
+from flask import Flask, request, jsonify, abort, Response
 from flask_cors import CORS
 import re
 from flask_jwt_extended import (
@@ -35,9 +37,12 @@ from flask_jwt_extended import (
 )
 from passlib.hash import bcrypt
 from werkzeug.utils import secure_filename
+from werkzeug.http import is_resource_modified
 from pymongo import MongoClient
 from pymongo.errors import PyMongoError
 
+from storage import create_storage
+
 # ------------------------------------------------------------
 # Configuration
 # ------------------------------------------------------------
@@ -45,6 +50,7 @@ from pymongo.errors import PyMongoError
 app = Flask(__name__)
 app.config['JWT_SECRET_KEY'] = os.getenv('JWT_SECRET_KEY', 'dev-secret-change-in-production')
 app.config['UPLOAD_FOLDER'] = os.getenv('UPLOAD_FOLDER', 'uploads')
+app.config['PHOTO_STORAGE'] = os.getenv('PHOTO_STORAGE', 'local')
 
 # CORS pour le frontend React (localhost + IP locale + ports 3000/3001)
 local_ip = os.getenv('LOCAL_IP')
@@ -79,9 +85,14 @@ cities_collection = db.cities
 photos_collection = db.photos
 notes_collection = db.notes
 
-# Ensure upload folder exists
+# Photo storage (local disk, GridFS or S3-compatible)
 upload_dir = os.path.join(os.path.dirname(__file__), app.config['UPLOAD_FOLDER'])
-os.makedirs(upload_dir, exist_ok=True)
+try:
+    photo_storage = create_storage(app.config['PHOTO_STORAGE'], db=db, upload_dir=upload_dir)
+    print(f"✅ Photo storage: {photo_storage.describe()}")
+except Exception as e:
+    print(f"❌ Photo storage initialization failed: {e}")
+    exit(1)
 
 # ------------------------------------------------------------
 # Utility Functions
@@ -109,9 +120,23 @@ def parse_date(date_str):
     except:
         return None
 
+IMAGE_MIMETYPES = {
+    'png': 'image/png',
+    'jpg': 'image/jpeg',
+    'jpeg': 'image/jpeg',
+    'gif': 'image/gif',
+    'webp': 'image/webp',
+}
+
 def allowed_image(filename):
     """Check if file is an allowed image type"""
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in {'png', 'jpg', 'jpeg', 'gif', 'webp'}
+    return '.' in filename and filename.rsplit('.', 1)[1].lower() in IMAGE_MIMETYPES
+
+def image_mimetype(filename):
+    """Mimetype derived from the checked extension, never from the client"""
+    if not allowed_image(filename):
+        return 'application/octet-stream'
+    return IMAGE_MIMETYPES[filename.rsplit('.', 1)[1].lower()]
 
 def user_to_dict(user):
     """Convert user document to dict"""
@@ -412,11 +437,9 @@ def delete_travel(travel_id):
     photos = list(photos_collection.find({'city_id': {'$in': city_ids}}))
     for photo in photos:
         try:
-            path = os.path.join(app.config['UPLOAD_FOLDER'], photo['filename'])
-            if os.path.exists(path):
-                os.remove(path)
-        except:
-            pass
+            photo_storage.delete(photo['filename'])
+        except Exception as e:
+            app.logger.warning("Failed to delete photo file %s: %s", photo['filename'], e)
     
     photos_collection.delete_many({'city_id': {'$in': city_ids}})
     notes_collection.delete_many({'city_id': {'$in': city_ids}})
@@ -489,10 +512,8 @@ def upload_photo(city_id):
         return jsonify({'error': 'unsupported_type'}), 415
 
     filename = secure_filename(f"{city_id}_{datetime.now().timestamp()}_{file.filename}")
-    upload_dir = os.path.join(os.path.dirname(__file__), app.config['UPLOAD_FOLDER'])
-    os.makedirs(upload_dir, exist_ok=True)
-    path = os.path.join(upload_dir, filename)
-    file.save(path)
+    # Le Content-Type envoyé par le client n'est pas fiable (XSS via text/html)
+    photo_storage.save(filename, file.stream, image_mimetype(filename))
 
     photo_doc = {
         'city_id': city_obj_id,
@@ -508,6 +529,12 @@ def upload_photo(city_id):
         'caption': photo_doc['caption']
     }), 201
 
+def set_photo_cache_headers(response):
+    """Browser-only cache, revalidated with ETag/Last-Modified on each view"""
+    # Pas de cache partagé (proxy, CDN) : une photo supprimée ne doit plus être servie
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+
 @app.route('/api/photos/<photo_id>/raw', methods=['GET'])
 @jwt_required(optional=True)
 def get_photo_raw(photo_id):
@@ -519,12 +546,34 @@ def get_photo_raw(photo_id):
     if not photo:
         abort(404)
     
-    upload_dir = os.path.join(os.path.dirname(__file__), app.config['UPLOAD_FOLDER'])
-    path = os.path.join(upload_dir, photo['filename'])
-    if not os.path.exists(path):
+    # La clé ne change jamais : son hash suffit comme ETag, et un 304
+    # est renvoyé sans même interroger le stockage
+    etag = hashlib.sha1(photo['filename'].encode('utf-8')).hexdigest()
+    if not is_resource_modified(request.environ, etag=etag):
+        response = Response(status=304)
+        response.set_etag(etag)
+        set_photo_cache_headers(response)
+        return response
+
+    try:
+        stored = photo_storage.open(photo['filename'])
+    except FileNotFoundError:
         abort(404)
-    
-    return send_file(path)
+
+    # Envoi par morceaux : le fichier n'est jamais chargé entièrement en mémoire
+    # Type déduit de l'extension : on ignore le contentType stocké par le driver
+    response = Response(stored, mimetype=image_mimetype(photo['filename']))
+    # Une réponse 206 enveloppe le corps : on ferme le StoredFile explicitement
+    response.call_on_close(stored.close)
+    response.headers['X-Content-Type-Options'] = 'nosniff'
+    response.set_etag(etag)
+    if stored.last_modified is not None:
+        response.last_modified = stored.last_modified
+    set_photo_cache_headers(response)
+    if stored.size is None:
+        return response.make_conditional(request)
+    response.content_length = stored.size
+    return response.make_conditional(request, accept_ranges=True, complete_length=stored.size)
 
 @app.route('/api/photos/<photo_id>', methods=['DELETE'])
 @jwt_required()
@@ -550,12 +599,9 @@ def delete_photo(photo_id):
 
     # Delete file
     try:
-        upload_dir = os.path.join(os.path.dirname(__file__), app.config['UPLOAD_FOLDER'])
-        path = os.path.join(upload_dir, photo['filename'])
-        if os.path.exists(path):
-            os.remove(path)
-    except:
-        pass
+        photo_storage.delete(photo['filename'])
+    except Exception as e:
+        app.logger.warning("Failed to delete photo file %s: %s", photo['filename'], e)
 
     photos_collection.delete_one({'_id': photo_obj_id})
     return jsonify({'success': True})
@@ -650,6 +696,6 @@ def health():
 
 if __name__ == '__main__':
     print("🚀 Starting Travel Tracker API with MongoDB...")
-    print(f"📁 Upload folder: {app.config['UPLOAD_FOLDER']}")
+    print(f"📁 Photo storage: {photo_storage.describe()}")
     print(f"🗄️  MongoDB: {MONGODB_URI}")
     app.run(debug=True, host='0.0.0.0', port=int(os.getenv('PORT', '5000')))
\ No newline at end of file
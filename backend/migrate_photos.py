@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Travel Tracker PWA - Photo storage migration
+============================================
+
+Copy every photo from one storage backend to another, in parallel and
+streamed chunk by chunk (no file is loaded fully in memory).
+
+Usage:
+  python migrate_photos.py --source local --dest s3
+  python migrate_photos.py --source gridfs --dest local --workers 16 --overwrite
+
+Backends are configured with the same environment variables as the API
+(MONGODB_URI, UPLOAD_FOLDER, GRIDFS_BUCKET, S3_*, see storage.py).
+Switch PHOTO_STORAGE to the destination once the copy is complete.
+"""
+
+import os
+import sys
+import argparse
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from storage import create_storage
+
+
+def copy_one(source, dest, key, overwrite=False):
+    """Copy a single key, return 'copied' or 'skipped'"""
+    if not overwrite and dest.exists(key):
+        return 'skipped'
+    with source.open(key) as stored:
+        dest.save(key, stored, stored.content_type)
+    return 'copied'
+
+
+def migrate(source, dest, workers=8, overwrite=False, dry_run=False):
+    """Copy all keys from source to dest, return (copied, skipped, failed) counts"""
+    copied = skipped = failed = 0
+    keys = iter(source.list_keys())
+
+    if dry_run:
+        for key in keys:
+            if not overwrite and dest.exists(key):
+                skipped += 1
+                continue
+            print(f"  would copy {key}")
+            copied += 1
+        return copied, skipped, failed
+
+    # Fenêtre bornée de copies en cours : les clés sont lues au fil de l'eau
+    # et chaque future est oubliée dès qu'elle est comptée
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        def submit(batch):
+            return {executor.submit(copy_one, source, dest, key, overwrite): key for key in batch}
+
+        pending = submit(islice(keys, workers * 2))
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                key = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    failed += 1
+                    print(f"❌ {key}: {e}", file=sys.stderr)
+                    continue
+                if result == 'copied':
+                    copied += 1
+                else:
+                    skipped += 1
+            pending.update(submit(islice(keys, len(done))))
+    return copied, skipped, failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Copy photos between storage backends")
+    parser.add_argument('--source', required=True, choices=['local', 'gridfs', 's3'])
+    parser.add_argument('--dest', required=True, choices=['local', 'gridfs', 's3'])
+    parser.add_argument('--upload-folder', default=os.getenv('UPLOAD_FOLDER', 'uploads'),
+                        help="local storage folder (default: UPLOAD_FOLDER)")
+    parser.add_argument('--workers', type=int, default=8, help="parallel copies (default: 8)")
+    parser.add_argument('--overwrite', action='store_true', help="copy files already present in dest")
+    parser.add_argument('--dry-run', action='store_true', help="list files without copying")
+    args = parser.parse_args(argv)
+
+    if args.source == args.dest:
+        parser.error("source and dest must be different backends")
+
+    db = None
+    if 'gridfs' in (args.source, args.dest):
+        from pymongo import MongoClient
+        db = MongoClient(os.getenv('MONGODB_URI', 'mongodb://localhost:27017/travel_tracker')).get_default_database()
+
+    upload_dir = os.path.join(os.path.dirname(__file__), args.upload_folder)
+    source = create_storage(args.source, db=db, upload_dir=upload_dir, workers=args.workers)
+    dest = create_storage(args.dest, db=db, upload_dir=upload_dir, workers=args.workers)
+
+    print(f"📦 {source.describe()} -> {dest.describe()} ({args.workers} workers)")
+    copied, skipped, failed = migrate(source, dest, workers=args.workers,
+                                      overwrite=args.overwrite, dry_run=args.dry_run)
+    print(f"✅ copied: {copied}, skipped: {skipped}, failed: {failed}")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Travel Tracker PWA - Photo storage backends
+===========================================
+
+Every photo route goes through a PhotoStorage driver so that gunicorn hosts
+do not have to share a local disk. Files are always streamed in chunks:
+uploads are copied from the request stream, downloads are yielded back to
+the client, nothing is loaded fully in memory.
+
+Drivers:
+- local  : files under UPLOAD_FOLDER (default, single node)
+- gridfs : GridFS bucket in the application MongoDB database
+- s3     : any S3-compatible object store (AWS S3, MinIO, ...)
+
+Environment variables:
+  PHOTO_STORAGE=local|gridfs|s3 (default: local)
+  STORAGE_CHUNK_SIZE=262144 (bytes, default 256 KiB)
+  GRIDFS_BUCKET=photos (default)
+  S3_BUCKET=travel-tracker-photos
+  S3_PREFIX= (optional key prefix, e.g. "photos/")
+  S3_ENDPOINT_URL=http://localhost:9000 (MinIO; leave empty for AWS)
+  S3_ACCESS_KEY=..., S3_SECRET_KEY=..., S3_REGION=us-east-1
+
+Local MinIO for development:
+  docker run -p 9000:9000 -e MINIO_ROOT_USER=minio -e MINIO_ROOT_PASSWORD=minio123 \\
+      minio/minio server /data
+"""
+
+import os
+import tempfile
+from datetime import datetime, timezone
+from typing import Iterator, Optional, BinaryIO
+
+DEFAULT_CHUNK_SIZE = 256 * 1024
+
+# umask du processus, lu une seule fois (os.umask n'est pas thread-safe)
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+class StoredFile:
+    """Opened stored file: readable like a file, iterable by chunks.
+
+    Werkzeug calls close() on response iterables once the body is sent,
+    so a StoredFile can be handed directly to a Flask Response.
+    """
+
+    def __init__(self, fileobj, size: Optional[int] = None, content_type: Optional[str] = None,
+                 last_modified: Optional[datetime] = None, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        self._fileobj = fileobj
+        self.size = size
+        self.content_type = content_type
+        self.last_modified = last_modified
+        self.chunk_size = chunk_size
+
+    def read(self, size: int = -1) -> bytes:
+        return self._fileobj.read(size)
+
+    def __iter__(self) -> Iterator[bytes]:
+        while True:
+            chunk = self._fileobj.read(self.chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+    def close(self):
+        try:
+            self._fileobj.close()
+        except Exception:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class PhotoStorage:
+    """Storage interface. Keys are flat file names (see secure_filename)."""
+
+    name = 'base'
+
+    def __init__(self, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        self.chunk_size = chunk_size
+
+    def save(self, key: str, stream: BinaryIO, content_type: Optional[str] = None) -> None:
+        """Store stream under key, replacing any existing file"""
+        raise NotImplementedError
+
+    def open(self, key: str) -> StoredFile:
+        """Open key for streamed reading, raise FileNotFoundError if missing"""
+        raise NotImplementedError
+
+    def delete(self, key: str) -> None:
+        """Delete key, silently ignore missing files"""
+        raise NotImplementedError
+
+    def exists(self, key: str) -> bool:
+        raise NotImplementedError
+
+    def list_keys(self) -> Iterator[str]:
+        raise NotImplementedError
+
+    def describe(self) -> str:
+        return self.name
+
+
+# ------------------------------------------------------------
+# Local filesystem
+# ------------------------------------------------------------
+
+class LocalStorage(PhotoStorage):
+    name = 'local'
+
+    def __init__(self, root: str, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        super().__init__(chunk_size)
+        self.root = os.path.abspath(root)
+        os.makedirs(self.root, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        # Les clés sont des noms de fichiers plats : pas de traversée de répertoire
+        if not key or os.path.basename(key) != key or key in ('.', '..'):
+            raise FileNotFoundError(key)
+        return os.path.join(self.root, key)
+
+    def save(self, key, stream, content_type=None):
+        path = self._path(key)
+        # Écriture dans un fichier temporaire puis rename atomique
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, prefix='.upload-')
+        try:
+            with os.fdopen(fd, 'wb') as out:
+                while True:
+                    chunk = stream.read(self.chunk_size)
+                    if not chunk:
+                        break
+                    out.write(chunk)
+            # mkstemp crée le fichier en 0600 : on revient aux droits par défaut
+            os.chmod(tmp_path, 0o666 & ~_UMASK)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def open(self, key):
+        path = self._path(key)
+        fileobj = open(path, 'rb')
+        stat = os.fstat(fileobj.fileno())
+        last_modified = datetime.fromtimestamp(stat.st_mtime, tz=timezone.utc)
+        return StoredFile(fileobj, size=stat.st_size, last_modified=last_modified,
+                          chunk_size=self.chunk_size)
+
+    def delete(self, key):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def exists(self, key):
+        try:
+            return os.path.isfile(self._path(key))
+        except FileNotFoundError:
+            return False
+
+    def list_keys(self):
+        with os.scandir(self.root) as entries:
+            for entry in entries:
+                if entry.is_file() and not entry.name.startswith('.upload-'):
+                    yield entry.name
+
+    def describe(self):
+        return f"local:{self.root}"
+
+
+# ------------------------------------------------------------
+# MongoDB GridFS
+# ------------------------------------------------------------
+
+class GridFSStorage(PhotoStorage):
+    name = 'gridfs'
+
+    def __init__(self, db, bucket_name: str = 'photos', chunk_size: int = DEFAULT_CHUNK_SIZE):
+        super().__init__(chunk_size)
+        from gridfs import GridFSBucket
+        self.db = db
+        self.bucket_name = bucket_name
+        self.bucket = GridFSBucket(db, bucket_name=bucket_name, chunk_size_bytes=chunk_size)
+        self.files = db[f'{bucket_name}.files']
+
+    def save(self, key, stream, content_type=None):
+        # GridFS n'impose pas l'unicité des noms : on remplace l'ancienne version
+        previous = [f['_id'] for f in self.files.find({'filename': key}, {'_id': 1})]
+        metadata = {'contentType': content_type} if content_type else None
+        self.bucket.upload_from_stream(key, stream, metadata=metadata)
+        for file_id in previous:
+            self.bucket.delete(file_id)
+
+    def open(self, key):
+        from gridfs.errors import NoFile
+        try:
+            grid_out = self.bucket.open_download_stream_by_name(key)
+        except NoFile:
+            raise FileNotFoundError(key)
+        content_type = (grid_out.metadata or {}).get('contentType')
+        # upload_date est stocké en UTC naïf par MongoDB
+        last_modified = grid_out.upload_date.replace(tzinfo=timezone.utc) if grid_out.upload_date else None
+        return StoredFile(grid_out, size=grid_out.length, content_type=content_type,
+                          last_modified=last_modified, chunk_size=self.chunk_size)
+
+    def delete(self, key):
+        from gridfs.errors import NoFile
+        for f in self.files.find({'filename': key}, {'_id': 1}):
+            try:
+                self.bucket.delete(f['_id'])
+            except NoFile:
+                pass
+
+    def exists(self, key):
+        return self.files.find_one({'filename': key}, {'_id': 1}) is not None
+
+    def list_keys(self):
+        # distinct() renvoie un seul document (limité à 16 Mo) : on passe par
+        # un curseur d'agrégation pour parcourir les noms sans tout charger
+        cursor = self.files.aggregate([{'$group': {'_id': '$filename'}}], allowDiskUse=True)
+        for doc in cursor:
+            yield doc['_id']
+
+    def describe(self):
+        return f"gridfs:{self.db.name}.{self.bucket_name}"
+
+
+# ------------------------------------------------------------
+# S3-compatible object store (AWS S3, MinIO)
+# ------------------------------------------------------------
+
+class S3Storage(PhotoStorage):
+    name = 's3'
+
+    def __init__(self, bucket: str, prefix: str = '', endpoint_url: Optional[str] = None,
+                 access_key: Optional[str] = None, secret_key: Optional[str] = None,
+                 region: Optional[str] = None, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                 max_concurrency: int = 4, max_pool_connections: int = 10):
+        super().__init__(chunk_size)
+        try:
+            import boto3
+            from boto3.s3.transfer import TransferConfig
+            from botocore.config import Config
+        except ImportError:
+            raise RuntimeError("PHOTO_STORAGE=s3 requires boto3 (pip install boto3)")
+
+        self.bucket = bucket
+        self.prefix = prefix
+        self.endpoint_url = endpoint_url
+        # Path-style obligatoire pour MinIO et la plupart des stockages compatibles
+        self.client = boto3.client(
+            's3',
+            endpoint_url=endpoint_url or None,
+            aws_access_key_id=access_key or None,
+            aws_secret_access_key=secret_key or None,
+            region_name=region or None,
+            config=Config(s3={'addressing_style': 'path'},
+                          max_pool_connections=max(max_pool_connections, max_concurrency)),
+        )
+        # Upload multipart : le flux est envoyé par parties, jamais entièrement en mémoire
+        self.transfer_config = TransferConfig(
+            multipart_threshold=max(chunk_size, 5 * 1024 * 1024),
+            multipart_chunksize=max(chunk_size, 5 * 1024 * 1024),
+            max_concurrency=max_concurrency,
+        )
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}{key}"
+
+    @staticmethod
+    def _is_not_found(error) -> bool:
+        code = str(error.response.get('Error', {}).get('Code', ''))
+        return code in ('404', 'NoSuchKey', 'NotFound')
+
+    def save(self, key, stream, content_type=None):
+        extra_args = {'ContentType': content_type} if content_type else None
+        self.client.upload_fileobj(stream, self.bucket, self._key(key),
+                                   ExtraArgs=extra_args, Config=self.transfer_config)
+
+    def open(self, key):
+        from botocore.exceptions import ClientError
+        try:
+            obj = self.client.get_object(Bucket=self.bucket, Key=self._key(key))
+        except ClientError as e:
+            if self._is_not_found(e):
+                raise FileNotFoundError(key)
+            raise
+        return StoredFile(obj['Body'], size=obj.get('ContentLength'), content_type=obj.get('ContentType'),
+                          last_modified=obj.get('LastModified'), chunk_size=self.chunk_size)
+
+    def delete(self, key):
+        # delete_object ne lève pas d'erreur si la clé n'existe pas
+        self.client.delete_object(Bucket=self.bucket, Key=self._key(key))
+
+    def exists(self, key):
+        from botocore.exceptions import ClientError
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self._key(key))
+            return True
+        except ClientError as e:
+            if self._is_not_found(e):
+                return False
+            raise
+
+    def list_keys(self):
+        paginator = self.client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self.prefix):
+            for obj in page.get('Contents', []):
+                key = obj['Key'][len(self.prefix):]
+                if key and '/' not in key:
+                    yield key
+
+    def describe(self):
+        location = self.endpoint_url or 'aws'
+        return f"s3:{location}/{self.bucket}/{self.prefix}"
+
+
+# ------------------------------------------------------------
+# Factory
+# ------------------------------------------------------------
+
+def create_storage(kind: str, db=None, upload_dir: Optional[str] = None,
+                   env: Optional[dict] = None, workers: Optional[int] = None) -> PhotoStorage:
+    """Build a storage driver from its kind and environment variables.
+
+    workers is the number of threads that will share the driver (migration
+    tool): S3 uploads then run one part at a time and the connection pool
+    is sized to the thread count.
+    """
+    env = os.environ if env is None else env
+    kind = (kind or 'local').strip().lower()
+    chunk_size = int(env.get('STORAGE_CHUNK_SIZE') or DEFAULT_CHUNK_SIZE)
+
+    if kind == 'local':
+        if not upload_dir:
+            raise ValueError("local storage requires an upload directory")
+        return LocalStorage(upload_dir, chunk_size=chunk_size)
+    if kind == 'gridfs':
+        if db is None:
+            raise ValueError("gridfs storage requires a MongoDB database")
+        return GridFSStorage(db, bucket_name=env.get('GRIDFS_BUCKET', 'photos'), chunk_size=chunk_size)
+    if kind == 's3':
+        bucket = env.get('S3_BUCKET')
+        if not bucket:
+            raise ValueError("s3 storage requires S3_BUCKET")
+        return S3Storage(
+            bucket,
+            prefix=env.get('S3_PREFIX', ''),
+            endpoint_url=env.get('S3_ENDPOINT_URL'),
+            access_key=env.get('S3_ACCESS_KEY'),
+            secret_key=env.get('S3_SECRET_KEY'),
+            region=env.get('S3_REGION'),
+            chunk_size=chunk_size,
+            **({'max_concurrency': 1, 'max_pool_connections': max(10, workers)} if workers else {}),
+        )
+    raise ValueError(f"unknown storage backend: {kind}")
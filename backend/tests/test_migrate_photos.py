@@ -0,0 +1,103 @@
+import io
+import os
+
+from storage import LocalStorage
+from migrate_photos import migrate
+
+
+class FlakyStorage(LocalStorage):
+    """LocalStorage whose open() fails for the given keys"""
+
+    def __init__(self, root, broken_keys):
+        super().__init__(root)
+        self.broken_keys = set(broken_keys)
+
+    def open(self, key):
+        if key in self.broken_keys:
+            raise IOError(f"cannot read {key}")
+        return super().open(key)
+
+
+def _read(storage, key):
+    with storage.open(key) as stored:
+        return stored.read()
+
+
+def test_migrate_copies_all_keys(tmp_path):
+    source = LocalStorage(str(tmp_path / 'source'))
+    dest = LocalStorage(str(tmp_path / 'dest'))
+    for key in ('a.jpg', 'b.jpg', 'c.jpg'):
+        source.save(key, io.BytesIO(key.encode()))
+
+    assert migrate(source, dest, workers=2) == (3, 0, 0)
+    assert sorted(dest.list_keys()) == ['a.jpg', 'b.jpg', 'c.jpg']
+    assert _read(dest, 'b.jpg') == b'b.jpg'
+
+
+def test_migrate_skips_existing_unless_overwrite(tmp_path):
+    source = LocalStorage(str(tmp_path / 'source'))
+    dest = LocalStorage(str(tmp_path / 'dest'))
+    source.save('a.jpg', io.BytesIO(b'new'))
+    source.save('b.jpg', io.BytesIO(b'new'))
+    dest.save('a.jpg', io.BytesIO(b'old'))
+
+    assert migrate(source, dest) == (1, 1, 0)
+    assert _read(dest, 'a.jpg') == b'old'
+
+    assert migrate(source, dest, overwrite=True) == (2, 0, 0)
+    assert _read(dest, 'a.jpg') == b'new'
+
+
+def test_migrate_counts_failures(tmp_path):
+    source = FlakyStorage(str(tmp_path / 'source'), broken_keys=['b.jpg'])
+    dest = LocalStorage(str(tmp_path / 'dest'))
+    for key in ('a.jpg', 'b.jpg', 'c.jpg'):
+        source.save(key, io.BytesIO(b'data'))
+
+    assert migrate(source, dest, workers=2) == (2, 0, 1)
+    assert sorted(dest.list_keys()) == ['a.jpg', 'c.jpg']
+
+
+def test_migrate_dry_run_copies_nothing(tmp_path):
+    source = LocalStorage(str(tmp_path / 'source'))
+    dest = LocalStorage(str(tmp_path / 'dest'))
+    source.save('a.jpg', io.BytesIO(b'data'))
+
+    assert migrate(source, dest, dry_run=True) == (1, 0, 0)
+    assert list(dest.list_keys()) == []
+
+
+def test_migrate_dry_run_matches_real_run(tmp_path):
+    source = LocalStorage(str(tmp_path / 'source'))
+    dest = LocalStorage(str(tmp_path / 'dest'))
+    source.save('a.jpg', io.BytesIO(b'new'))
+    source.save('b.jpg', io.BytesIO(b'new'))
+    dest.save('a.jpg', io.BytesIO(b'old'))
+
+    assert migrate(source, dest, dry_run=True) == (1, 1, 0)
+    assert migrate(source, dest, dry_run=True, overwrite=True) == (2, 0, 0)
+    assert migrate(source, dest) == (1, 1, 0)
+
+
+def test_migrate_bounds_keys_in_flight(tmp_path):
+    class CountingStorage(LocalStorage):
+        """Records how many listed keys are not yet copied"""
+
+        def __init__(self, root):
+            super().__init__(root)
+            self.listed = 0
+            self.max_in_flight = 0
+
+        def list_keys(self):
+            for key in super().list_keys():
+                self.listed += 1
+                self.max_in_flight = max(self.max_in_flight, self.listed - len(os.listdir(dest.root)))
+                yield key
+
+    source = CountingStorage(str(tmp_path / 'source'))
+    dest = LocalStorage(str(tmp_path / 'dest'))
+    for i in range(50):
+        source.save(f'{i}.jpg', io.BytesIO(b'data'))
+
+    assert migrate(source, dest, workers=2) == (50, 0, 0)
+    assert source.max_in_flight <= 2 * 2 + 1
@@ -0,0 +1,164 @@
+import io
+import os
+import tempfile
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip('flask')
+
+from bson import ObjectId
+
+# app.py initialise le stockage local à l'import : on l'éloigne du dépôt
+os.environ.setdefault('UPLOAD_FOLDER', tempfile.mkdtemp(prefix='travel-tracker-test-'))
+
+import app as app_module
+from flask_jwt_extended import create_access_token
+from storage import LocalStorage
+
+
+class FakeCollection:
+    """In-memory stand-in for the few pymongo calls the photo routes make"""
+
+    def __init__(self, docs=()):
+        self.docs = [dict(d) for d in docs]
+
+    @staticmethod
+    def _matches(doc, query):
+        for field, expected in query.items():
+            if isinstance(expected, dict) and '$in' in expected:
+                if doc.get(field) not in expected['$in']:
+                    return False
+            elif doc.get(field) != expected:
+                return False
+        return True
+
+    def find(self, query=None):
+        return [d for d in self.docs if self._matches(d, query or {})]
+
+    def find_one(self, query=None):
+        found = self.find(query)
+        return found[0] if found else None
+
+    def insert_one(self, doc):
+        doc.setdefault('_id', ObjectId())
+        self.docs.append(doc)
+
+        class Result:
+            inserted_id = doc['_id']
+        return Result()
+
+    def delete_one(self, query):
+        found = self.find_one(query)
+        if found is not None:
+            self.docs.remove(found)
+
+    def delete_many(self, query):
+        self.docs = [d for d in self.docs if not self._matches(d, query)]
+
+
+@pytest.fixture
+def env(tmp_path, monkeypatch):
+    """Patched app with one user owning one travel, one city and one photo"""
+    user_id, travel_id, city_id, photo_id = ObjectId(), ObjectId(), ObjectId(), ObjectId()
+    storage = LocalStorage(str(tmp_path / 'photos'), chunk_size=4)
+    storage.save('photo.png', io.BytesIO(b'0123456789'))
+
+    monkeypatch.setattr(app_module, 'photo_storage', storage)
+    monkeypatch.setattr(app_module, 'travels_collection',
+                        FakeCollection([{'_id': travel_id, 'user_id': user_id}]))
+    monkeypatch.setattr(app_module, 'cities_collection',
+                        FakeCollection([{'_id': city_id, 'travel_id': travel_id, 'name': 'Paris'}]))
+    monkeypatch.setattr(app_module, 'photos_collection',
+                        FakeCollection([{'_id': photo_id, 'city_id': city_id, 'filename': 'photo.png'}]))
+    monkeypatch.setattr(app_module, 'notes_collection', FakeCollection())
+
+    with app_module.app.app_context():
+        token = create_access_token(identity=str(user_id))
+
+    return SimpleNamespace(
+        client=app_module.app.test_client(),
+        storage=storage,
+        headers={'Authorization': f'Bearer {token}'},
+        travel_id=str(travel_id),
+        city_id=str(city_id),
+        photo_id=str(photo_id),
+    )
+
+
+def test_raw_streams_photo(env):
+    response = env.client.get(f'/api/photos/{env.photo_id}/raw')
+
+    assert response.status_code == 200
+    assert response.data == b'0123456789'
+    assert response.headers['Content-Length'] == '10'
+    assert response.headers['Content-Type'] == 'image/png'
+    assert response.headers['X-Content-Type-Options'] == 'nosniff'
+    assert response.headers['ETag']
+    assert response.headers['Last-Modified']
+    assert 'private' in response.headers['Cache-Control']
+    response.close()
+
+
+def test_raw_returns_304_for_matching_etag(env):
+    first = env.client.get(f'/api/photos/{env.photo_id}/raw')
+    etag = first.headers['ETag']
+    first.close()
+    # La réponse 304 ne doit pas dépendre du stockage
+    env.storage.delete('photo.png')
+
+    response = env.client.get(f'/api/photos/{env.photo_id}/raw', headers={'If-None-Match': etag})
+
+    assert response.status_code == 304
+    assert response.data == b''
+    assert response.headers['ETag'] == etag
+
+
+def test_raw_serves_range(env):
+    response = env.client.get(f'/api/photos/{env.photo_id}/raw', headers={'Range': 'bytes=2-5'})
+
+    assert response.status_code == 206
+    assert response.data == b'2345'
+    assert response.headers['Content-Range'] == 'bytes 2-5/10'
+    response.close()
+
+
+def test_raw_missing_file_returns_404(env):
+    env.storage.delete('photo.png')
+
+    response = env.client.get(f'/api/photos/{env.photo_id}/raw')
+
+    assert response.status_code == 404
+
+
+def test_upload_goes_through_storage_with_server_side_type(env):
+    response = env.client.post(
+        f'/api/cities/{env.city_id}/photos',
+        headers=env.headers,
+        data={'photo': (io.BytesIO(b'<script>alert(1)</script>'), 'x.png', 'text/html')},
+        content_type='multipart/form-data',
+    )
+
+    assert response.status_code == 201
+    body = response.get_json()
+    assert env.storage.exists(body['filename'])
+
+    raw = env.client.get(f"/api/photos/{body['id']}/raw")
+    assert raw.headers['Content-Type'] == 'image/png'
+    assert raw.data == b'<script>alert(1)</script>'
+    raw.close()
+
+
+def test_delete_photo_removes_stored_file(env):
+    response = env.client.delete(f'/api/photos/{env.photo_id}', headers=env.headers)
+
+    assert response.status_code == 200
+    assert not env.storage.exists('photo.png')
+
+
+def test_delete_travel_removes_stored_files(env):
+    response = env.client.delete(f'/api/travels/{env.travel_id}', headers=env.headers)
+
+    assert response.status_code == 200
+    assert not env.storage.exists('photo.png')
+    assert app_module.photos_collection.find() == []
@@ -0,0 +1,178 @@
+import io
+import os
+import uuid
+
+import pytest
+
+from storage import LocalStorage, GridFSStorage, S3Storage, create_storage
+
+
+def _s3_storage():
+    """S3 driver against the endpoint in S3_ENDPOINT_URL (e.g. a local MinIO)"""
+    pytest.importorskip('boto3')
+    storage = S3Storage(
+        os.environ.get('S3_BUCKET') or f"travel-tracker-test-{uuid.uuid4().hex[:12]}",
+        prefix=f"test-{uuid.uuid4().hex[:8]}/",
+        endpoint_url=os.environ['S3_ENDPOINT_URL'],
+        access_key=os.environ.get('S3_ACCESS_KEY'),
+        secret_key=os.environ.get('S3_SECRET_KEY'),
+        region=os.environ.get('S3_REGION', 'us-east-1'),
+        chunk_size=4,
+    )
+    try:
+        storage.client.create_bucket(Bucket=storage.bucket)
+    except storage.client.exceptions.BucketAlreadyOwnedByYou:
+        pass
+    return storage
+
+
+@pytest.fixture(scope='session')
+def mongo_client():
+    """Client on MONGODB_TEST_URI (default: local MongoDB), pinged once"""
+    pymongo = pytest.importorskip('pymongo')
+    from pymongo.errors import PyMongoError
+    client = pymongo.MongoClient(os.environ.get('MONGODB_TEST_URI', 'mongodb://localhost:27017'),
+                                 serverSelectionTimeoutMS=500)
+    try:
+        client.admin.command('ping')
+    except PyMongoError:
+        client.close()
+        pytest.skip("MongoDB not reachable (set MONGODB_TEST_URI to run GridFS tests)")
+    yield client
+    client.close()
+
+
+@pytest.fixture
+def mongo_db(mongo_client):
+    db = mongo_client[f"travel_tracker_test_{uuid.uuid4().hex[:12]}"]
+    yield db
+    mongo_client.drop_database(db.name)
+
+
+@pytest.fixture(params=['local', 'gridfs', 's3'])
+def storage(request, tmp_path):
+    if request.param == 'local':
+        yield LocalStorage(str(tmp_path / 'uploads'), chunk_size=4)
+        return
+
+    if request.param == 'gridfs':
+        yield GridFSStorage(request.getfixturevalue('mongo_db'), chunk_size=4)
+        return
+
+    if not os.environ.get('S3_ENDPOINT_URL'):
+        pytest.skip("S3_ENDPOINT_URL not set (start a local MinIO to run S3 tests)")
+    s3 = _s3_storage()
+    yield s3
+    for key in list(s3.list_keys()):
+        s3.delete(key)
+    if not os.environ.get('S3_BUCKET'):
+        s3.client.delete_bucket(Bucket=s3.bucket)
+
+
+def test_save_and_open(storage):
+    storage.save('photo.jpg', io.BytesIO(b'hello world'), 'image/jpeg')
+
+    with storage.open('photo.jpg') as stored:
+        assert stored.size == 11
+        assert stored.last_modified is not None
+        chunks = list(stored)
+
+    assert b''.join(chunks) == b'hello world'
+    assert all(len(chunk) <= 4 for chunk in chunks)
+
+
+def test_save_replaces_existing(storage):
+    storage.save('photo.jpg', io.BytesIO(b'first'))
+    storage.save('photo.jpg', io.BytesIO(b'second'))
+
+    with storage.open('photo.jpg') as stored:
+        assert stored.read() == b'second'
+    assert list(storage.list_keys()) == ['photo.jpg']
+
+
+def test_exists_and_delete(storage):
+    storage.save('photo.jpg', io.BytesIO(b'data'))
+    assert storage.exists('photo.jpg')
+
+    storage.delete('photo.jpg')
+    assert not storage.exists('photo.jpg')
+    # Supprimer une clé absente ne lève pas d'erreur
+    storage.delete('photo.jpg')
+
+
+def test_open_missing_raises(storage):
+    with pytest.raises(FileNotFoundError):
+        storage.open('missing.jpg')
+
+
+def test_list_keys(storage):
+    for key in ('a.jpg', 'b.png', 'c.gif'):
+        storage.save(key, io.BytesIO(key.encode()))
+
+    assert sorted(storage.list_keys()) == ['a.jpg', 'b.png', 'c.gif']
+
+
+@pytest.mark.parametrize('key', ['..', '.', 'a/b', '../escape.jpg', ''])
+def test_local_rejects_traversal_keys(tmp_path, key):
+    storage = LocalStorage(str(tmp_path / 'uploads'))
+
+    with pytest.raises(FileNotFoundError):
+        storage.save(key, io.BytesIO(b'data'))
+    with pytest.raises(FileNotFoundError):
+        storage.open(key)
+    assert not storage.exists(key)
+    assert not os.path.exists(tmp_path / 'escape.jpg')
+
+
+def test_local_save_uses_default_permissions(tmp_path):
+    storage = LocalStorage(str(tmp_path))
+    storage.save('photo.jpg', io.BytesIO(b'data'))
+
+    umask = os.umask(0)
+    os.umask(umask)
+    assert os.stat(tmp_path / 'photo.jpg').st_mode & 0o777 == 0o666 & ~umask
+
+
+def test_local_save_leaves_no_temp_file_on_error(tmp_path):
+    class BrokenStream:
+        def read(self, size=-1):
+            raise IOError("client disconnected")
+
+    storage = LocalStorage(str(tmp_path))
+    with pytest.raises(IOError):
+        storage.save('photo.jpg', BrokenStream())
+
+    assert os.listdir(tmp_path) == []
+
+
+def test_create_storage_errors(tmp_path):
+    assert isinstance(create_storage('local', upload_dir=str(tmp_path), env={}), LocalStorage)
+    with pytest.raises(ValueError):
+        create_storage('local', env={})
+    with pytest.raises(ValueError):
+        create_storage('gridfs', env={})
+    with pytest.raises(ValueError):
+        create_storage('s3', env={})
+    with pytest.raises(ValueError):
+        create_storage('ftp', env={})
+
+
+def test_gridfs_save_removes_previous_revision(mongo_db):
+    storage = GridFSStorage(mongo_db)
+    storage.save('photo.jpg', io.BytesIO(b'first'), 'image/jpeg')
+    storage.save('photo.jpg', io.BytesIO(b'second'), 'image/jpeg')
+
+    assert storage.files.count_documents({'filename': 'photo.jpg'}) == 1
+    with storage.open('photo.jpg') as stored:
+        assert stored.read() == b'second'
+        assert stored.content_type == 'image/jpeg'
+
+
+def test_gridfs_list_keys_groups_duplicate_names(mongo_db):
+    storage = GridFSStorage(mongo_db)
+    # Révisions multiples écrites directement, comme un autre client GridFS le ferait
+    storage.bucket.upload_from_stream('a.jpg', io.BytesIO(b'1'))
+    storage.bucket.upload_from_stream('a.jpg', io.BytesIO(b'2'))
+    storage.bucket.upload_from_stream('b.jpg', io.BytesIO(b'3'))
+
+    assert sorted(storage.list_keys()) == ['a.jpg', 'b.jpg']